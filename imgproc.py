@@ -1,5 +1,13 @@
+import io
 import os
 import sys
+import argparse
+import shutil
+import queue
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image, ImageEnhance
 from rich.console import Console
 from rich.prompt import Prompt
@@ -7,42 +15,483 @@ from rich.table import Table
 from rich import print
 from rich.panel import Panel
 from rich.progress import Progress
-import time
+import ctypes
+import mmap
 import cv2
 import numpy as np
 
+# PyTurboJPEG is optional, used for scaled JPEG decoding in resize
+try:
+    from turbojpeg import TurboJPEG, TJCS_CMYK, TJCS_GRAY, TJCS_YCCK
+except ImportError:
+    TurboJPEG = None
+
+# numba is optional, used to fuse the enhance post-processing into one pass
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# TensorRT is optional, EDSR falls back to OpenCV DNN on the CPU without it
+try:
+    import tensorrt as trt
+    from cuda import cudart
+except ImportError:
+    trt = None
+
 console = Console()
 
+# Image file extensions handled by every command
+SUPPORTED_FORMATS = frozenset(['.jpg', '.jpeg', '.png', '.bmp'])
+
+# Resampling filter used by the resize command for upscales, downscales use cv2.INTER_AREA
+RESAMPLE = Image.Resampling.BICUBIC
+
+# Extensions that name the same codec, used to skip re-encoding on convert
+FORMAT_ALIASES = {'jpg': 'jpeg', 'tif': 'tiff'}
+
+# Available 2x super resolution models: name -> (model file, download URL)
+SR_MODELS = {
+    'fsrcnn': ("FSRCNN_x2.pb", "https://github.com/Saafke/FSRCNN_Tensorflow/raw/master/models/FSRCNN_x2.pb"),
+    'espcn': ("ESPCN_x2.pb", "https://github.com/fannymonori/TF-ESPCN/raw/master/export/ESPCN_x2.pb"),
+    'lapsrn': ("LapSRN_x2.pb", "https://github.com/fannymonori/TF-LapSRN/raw/master/export/LapSRN_x2.pb"),
+    'edsr': ("EDSR_x2.pb", "https://github.com/Saafke/EDSR_Tensorflow/raw/master/models/EDSR_x2.pb"),
+}
+DEFAULT_SR_MODEL = 'fsrcnn'
+
+# Serialized TensorRT engines for EDSR by precision, see README for how to build them
+TRT_ENGINES = {
+    'fp16': "edsr_x2_fp16.plan",
+    'int8': "edsr_x2_int8.plan",
+}
+INT8_CALIB_IMAGES = 200
+INT8_CALIB_SIZE = 256
+
+# Contrast and brightness applied after super resolution
+ENHANCE_ALPHA = 1.2  # Contrast control
+ENHANCE_BETA = 10    # Brightness control
+SHARPEN_AMOUNT = 0.5 # Unsharp mask strength
+
+# Thread count for the metadata-only renames in organize, enough to keep the disk queue full
+IO_WORKERS = 32
+
+# Maximum number of same-sized images handed to the SR model at once
+ENHANCE_BATCH_SIZE = 8
+
+# Images larger than this are upscaled with bicubic interpolation instead of SR
+SR_MAX_PIXELS = 800 * 800
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def fused_postprocess(src, blur, dst, lut, amount):
+        """Unsharp mask followed by the contrast/brightness lookup table in a single pass"""
+        height, width, channels = src.shape
+        for i in numba.prange(height):
+            for j in range(width):
+                for c in range(channels):
+                    # Round and saturate like addWeighted does before the table lookup
+                    value = np.rint(src[i, j, c] * (1.0 + amount) - blur[i, j, c] * amount)
+                    dst[i, j, c] = lut[int(min(255.0, max(0.0, value)))]
+
+def download_model(url, model_path, chunk_size=1 << 20):
+    """Download a model file, resuming a previous partial download if there is one"""
+    part_path = model_path + ".part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+    except urllib.error.HTTPError as e:
+        if e.code != 416 or not offset:
+            raise
+        
+        # Range past the end, the server reports the full size as "bytes */N"
+        content_range = e.headers.get("Content-Range", "")
+        total = content_range.rpartition("/")[2]
+        if total.isdigit() and int(total) == offset:
+            os.replace(part_path, model_path)
+            return
+        
+        # The partial file doesn't match the remote file, start over
+        os.remove(part_path)
+        return download_model(url, model_path, chunk_size)
+    
+    with response:
+        # The server ignored the range request, start over
+        if offset and response.status != 206:
+            offset = 0
+        length = response.headers.get("Content-Length")
+        total = int(length) + offset if length else None
+        
+        with open(part_path, "ab" if offset else "wb") as f, Progress() as progress:
+            task = progress.add_task("[yellow]Downloading AI enhancement model...", total=total, completed=offset)
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                progress.advance(task, len(chunk))
+    
+    # Keep the partial file so the next attempt can resume
+    if total is not None and os.path.getsize(part_path) != total:
+        raise Exception("Model download incomplete, run enhance again to resume")
+    os.replace(part_path, model_path)
+
+class BackgroundWriter:
+    """Write encoded files to disk on a separate thread"""
+    def __init__(self, maxsize=8):
+        # Bounded so encoded images can't pile up in memory faster than the disk drains them
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.errors = []
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, path, data):
+        self.queue.put((path, data))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            
+            path, data = item
+            try:
+                with open(path, 'wb') as f:
+                    f.write(data)
+            except Exception as e:
+                self.errors.append((path, str(e)))
+
+    def close(self):
+        """Wait for all queued files to be written, returns a list of (path, error) for failed writes"""
+        self.queue.put(None)
+        self.thread.join()
+        return self.errors
+
+def cuda_check(result):
+    """Unpack a cuda-python call result, raising on error"""
+    err, *values = result
+    if err != cudart.cudaError_t.cudaSuccess:
+        raise Exception(f"CUDA error: {cudart.cudaGetErrorName(err)[1].decode()}")
+    return values[0] if len(values) == 1 else values
+
+class TensorRTUpsampler:
+    """Run a 2x super resolution TensorRT engine on BGR uint8 images"""
+    def __init__(self, engine_path):
+        logger = trt.Logger(trt.Logger.WARNING)
+        self.runtime = trt.Runtime(logger)
+        # Deserialize straight from the page cache instead of copying the file into memory
+        with open(engine_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            self.engine = self.runtime.deserialize_cuda_engine(buf)
+        if self.engine is None:
+            raise Exception(f"Failed to load TensorRT engine: {engine_path}")
+        
+        self.context = self.engine.create_execution_context()
+        self.input_name = self.engine.get_tensor_name(0)
+        self.output_name = self.engine.get_tensor_name(1)
+        
+        # Input limits from the optimization profile, or the fixed shape of a static engine
+        shape = tuple(self.engine.get_tensor_shape(self.input_name))
+        if -1 in shape:
+            min_shape, _, max_shape = self.engine.get_tensor_profile_shape(self.input_name, 0)
+        else:
+            min_shape = max_shape = shape
+        self.max_batch = max_shape[0]
+        self.min_size = tuple(min_shape[2:])
+        self.max_size = tuple(max_shape[2:])
+        
+        self.stream = cuda_check(cudart.cudaStreamCreate())
+        self.buffers = []
+        self.events = []
+        self.slots = []
+        self.shape = None
+
+    def allocate(self, height, width):
+        """Allocate two sets of pinned host and device buffers for one input size"""
+        self.free()
+        in_shape = (self.max_batch, 3, height, width)
+        out_shape = (self.max_batch, 3, height * 2, width * 2)
+        
+        for _ in range(2):
+            host_in, device_in = self._alloc_pair(in_shape)
+            host_out, device_out = self._alloc_pair(out_shape)
+            event = cuda_check(cudart.cudaEventCreate())
+            self.events.append(event)
+            self.slots.append((host_in, device_in, host_out, device_out, event))
+        self.shape = (height, width)
+
+    def _alloc_pair(self, shape):
+        nbytes = int(np.prod(shape)) * 4
+        host_ptr = cuda_check(cudart.cudaMallocHost(nbytes))
+        device_ptr = cuda_check(cudart.cudaMalloc(nbytes))
+        self.buffers.append((host_ptr, device_ptr))
+        
+        host = (ctypes.c_float * int(np.prod(shape))).from_address(host_ptr)
+        return np.ctypeslib.as_array(host).reshape(shape), device_ptr
+
+    def free(self):
+        for host_ptr, device_ptr in self.buffers:
+            cudart.cudaFreeHost(host_ptr)
+            cudart.cudaFree(device_ptr)
+        for event in self.events:
+            cudart.cudaEventDestroy(event)
+        self.buffers = []
+        self.events = []
+        self.slots = []
+        self.shape = None
+
+    def close(self):
+        """Release all buffers and the CUDA stream"""
+        self.free()
+        if self.stream is not None:
+            cudart.cudaStreamDestroy(self.stream)
+            self.stream = None
+
+    def supports(self, img):
+        """Whether the engine accepts this image's height and width"""
+        height, width = img.shape[:2]
+        return (self.min_size[0] <= height <= self.max_size[0]
+                and self.min_size[1] <= width <= self.max_size[1])
+
+    def upsample(self, img):
+        return self.upsample_batch([img])[0]
+
+    def upsample_batch(self, imgs):
+        """Upscale same-sized images, max_batch at a time"""
+        height, width = imgs[0].shape[:2]
+        if self.shape != (height, width):
+            self.allocate(height, width)
+        
+        results = []
+        pending = None
+        for i, start in enumerate(range(0, len(imgs), self.max_batch)):
+            chunk = imgs[start:start + self.max_batch]
+            count = len(chunk)
+            host_in, device_in, host_out, device_out, event = self.slots[i % 2]
+            
+            # BGR HWC -> RGB NCHW float, packed while the GPU works on the previous chunk
+            for j, img in enumerate(chunk):
+                host_in[j] = img[:, :, ::-1].transpose(2, 0, 1)
+            
+            if not self.context.set_input_shape(self.input_name, (count, 3, height, width)):
+                raise Exception(f"TensorRT engine does not accept a {width}x{height} input")
+            self.context.set_tensor_address(self.input_name, device_in)
+            self.context.set_tensor_address(self.output_name, device_out)
+            
+            cuda_check(cudart.cudaMemcpyAsync(
+                device_in, host_in.ctypes.data, host_in[:count].nbytes,
+                cudart.cudaMemcpyKind.cudaMemcpyHostToDevice, self.stream))
+            if not self.context.execute_async_v3(self.stream):
+                raise Exception("TensorRT inference failed")
+            cuda_check(cudart.cudaMemcpyAsync(
+                host_out.ctypes.data, device_out, host_out[:count].nbytes,
+                cudart.cudaMemcpyKind.cudaMemcpyDeviceToHost, self.stream))
+            cuda_check(cudart.cudaEventRecord(event, self.stream))
+            
+            if pending is not None:
+                results.extend(self._collect(*pending))
+            pending = (host_out, count, event)
+        
+        results.extend(self._collect(*pending))
+        return results
+
+    def _collect(self, host_out, count, event):
+        cuda_check(cudart.cudaEventSynchronize(event))
+        # RGB NCHW float -> BGR HWC uint8
+        return [np.clip(out[::-1].transpose(1, 2, 0), 0, 255).round().astype(np.uint8)
+                for out in host_out[:count]]
+
+if trt is not None:
+    class EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+        """Feed sample images to TensorRT for INT8 calibration"""
+        def __init__(self, image_paths, cache_path):
+            trt.IInt8EntropyCalibrator2.__init__(self)
+            self.image_paths = image_paths
+            self.cache_path = cache_path
+            self.index = 0
+            self.device_input = cuda_check(cudart.cudaMalloc(3 * INT8_CALIB_SIZE * INT8_CALIB_SIZE * 4))
+
+        def get_batch_size(self):
+            return 1
+
+        def get_batch(self, names):
+            while self.index < len(self.image_paths):
+                img = cv2.imread(self.image_paths[self.index])
+                self.index += 1
+                if img is None:
+                    continue
+                
+                img = cv2.resize(img, (INT8_CALIB_SIZE, INT8_CALIB_SIZE), interpolation=cv2.INTER_AREA)
+                batch = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32)
+                cuda_check(cudart.cudaMemcpy(
+                    self.device_input, batch.ctypes.data, batch.nbytes,
+                    cudart.cudaMemcpyKind.cudaMemcpyHostToDevice))
+                return [self.device_input]
+            return None
+
+        def read_calibration_cache(self):
+            if os.path.exists(self.cache_path):
+                with open(self.cache_path, "rb") as f:
+                    return f.read()
+            return None
+
+        def write_calibration_cache(self, cache):
+            with open(self.cache_path, "wb") as f:
+                f.write(cache)
+
+        def close(self):
+            cudart.cudaFree(self.device_input)
+
+def build_int8_engine(onnx_path, calib_dir):
+    """Build an INT8 EDSR engine, keeping the head and tail convolutions in FP32"""
+    if trt is None:
+        raise Exception("TensorRT is not installed")
+    
+    images = sorted(
+        os.path.join(calib_dir, f) for f in os.listdir(calib_dir)
+        if os.path.splitext(f)[1].lower() in SUPPORTED_FORMATS
+    )
+    calib_images, holdout = images[:INT8_CALIB_IMAGES], images[INT8_CALIB_IMAGES:]
+    
+    logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(logger)
+    # TensorRT 8.x needs explicit batch for ONNX models, 10.x always uses it
+    flags = 0
+    if hasattr(trt.NetworkDefinitionCreationFlag, "EXPLICIT_BATCH"):
+        flags = 1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH)
+    network = builder.create_network(flags)
+    parser = trt.OnnxParser(network, logger)
+    with open(onnx_path, "rb") as f:
+        if not parser.parse(f.read()):
+            raise Exception(f"Failed to parse ONNX model: {parser.get_error(0)}")
+    
+    config = builder.create_builder_config()
+    config.set_flag(trt.BuilderFlag.INT8)
+    config.set_flag(trt.BuilderFlag.FP16)
+    config.set_flag(trt.BuilderFlag.OBEY_PRECISION_CONSTRAINTS)
+    
+    # Only the residual body is quantized, head and tail stay in FP32
+    convs = [network.get_layer(i) for i in range(network.num_layers)
+             if network.get_layer(i).type == trt.LayerType.CONVOLUTION]
+    for layer in (convs[0], convs[-1]):
+        layer.precision = trt.float32
+        layer.set_output_type(0, trt.float32)
+    
+    input_name = network.get_input(0).name
+    profile = builder.create_optimization_profile()
+    profile.set_shape(input_name, (1, 3, 16, 16), (4, 3, 400, 400), (4, 3, 800, 800))
+    config.add_optimization_profile(profile)
+    
+    calib_profile = builder.create_optimization_profile()
+    calib_shape = (1, 3, INT8_CALIB_SIZE, INT8_CALIB_SIZE)
+    calib_profile.set_shape(input_name, calib_shape, calib_shape, calib_shape)
+    config.set_calibration_profile(calib_profile)
+    # The cache is named after the model so scales from another ONNX file are never reused
+    calibrator = EntropyCalibrator(calib_images, os.path.splitext(onnx_path)[0] + "_int8.cache")
+    config.int8_calibrator = calibrator
+    
+    console.print(f"[yellow]Calibrating INT8 engine on {len(calib_images)} images...[/yellow]")
+    try:
+        engine = builder.build_serialized_network(network, config)
+    finally:
+        calibrator.close()
+    if engine is None:
+        raise Exception("Failed to build INT8 engine")
+    with open(TRT_ENGINES['int8'], "wb") as f:
+        f.write(engine)
+    console.print(f"[green]INT8 engine saved to {TRT_ENGINES['int8']}[/green]")
+    
+    # Compare against the FP16 engine on images not used for calibration
+    if holdout and os.path.exists(TRT_ENGINES['fp16']):
+        int8 = TensorRTUpsampler(TRT_ENGINES['int8'])
+        fp16 = TensorRTUpsampler(TRT_ENGINES['fp16'])
+        scores = []
+        try:
+            for path in holdout[:20]:
+                img = cv2.imread(path)
+                if img is None or not (int8.supports(img) and fp16.supports(img)):
+                    continue
+                scores.append(cv2.PSNR(int8.upsample(img), fp16.upsample(img)))
+        finally:
+            int8.close()
+            fp16.close()
+        if scores:
+            console.print(f"[cyan]Holdout PSNR INT8 vs FP16: {np.mean(scores):.2f} dB over {len(scores)} images[/cyan]")
+
 class ImageProcessor:
-    def __init__(self):
-        self.supported_formats = ['.jpg', '.jpeg', '.png', '.bmp']
+    def __init__(self, quant='fp16', detail='fast'):
+        self.supported_formats = sorted(SUPPORTED_FORMATS)
+        self._fmt_set = SUPPORTED_FORMATS
+        self._tj = None
+        if TurboJPEG is not None:
+            try:
+                self._tj = TurboJPEG()
+            except Exception:
+                # The Python package is installed but libturbojpeg is missing
+                pass
         self.filters = {
             'brightness': self.adjust_brightness,
             'contrast': self.adjust_contrast,
             'sharpen': self.adjust_sharpness,
             'grayscale': self.convert_grayscale
         }
-        # Initialize AI model
-        self.setup_ai_model()
+        self.quant = quant
+        self.detail = detail
+        # The AI model is loaded on first use, see load_ai_model
+        self.sr = None
+        self.sr_model = DEFAULT_SR_MODEL
+        self.loaded_model = None
+        self.trt_engine = None
+        self.use_cuda = False
+        self.writer = None
+        self._cuda_blur = None
+        # Lookup table equivalent to convertScaleAbs(alpha, beta) on uint8 pixels
+        self._scale_lut = np.clip(np.round(np.arange(256) * ENHANCE_ALPHA + ENHANCE_BETA), 0, 255).astype(np.uint8)
+
+    def load_ai_model(self):
+        """Load the selected AI model if it isn't loaded yet"""
+        if self.loaded_model != self.sr_model:
+            self.setup_ai_model(self.sr_model)
 
-    def setup_ai_model(self):
+    def setup_ai_model(self, model_name=DEFAULT_SR_MODEL):
         """Setup the OpenCV Super Resolution model"""
+        self.use_cuda = False
+        if self.trt_engine is not None:
+            self.trt_engine.close()
+        self.trt_engine = None
         try:
             self.sr = cv2.dnn_superres.DnnSuperResImpl_create()
-            model_path = "EDSR_x2.pb"
+            model_path, url = SR_MODELS[model_name]
             
             # Download the model if it doesn't exist
             if not os.path.exists(model_path):
-                console.print("[yellow]Downloading AI enhancement model...[/yellow]")
-                url = "https://github.com/Saafke/EDSR_Tensorflow/raw/master/models/EDSR_x2.pb"
-                import urllib.request
-                urllib.request.urlretrieve(url, model_path)
+                download_model(url, model_path)
             
             self.sr.readModel(model_path)
-            self.sr.setModel("edsr", 2)  # 2x upscaling
+            self.sr.setModel(model_name, 2)  # 2x upscaling
             console.print("[green]AI Enhancement model loaded successfully! 🤖[/green]")
+
+            # Run post-processing on the GPU when OpenCV was built with CUDA
+            if hasattr(cv2, "cuda") and cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                self.use_cuda = True
+                console.print("[green]CUDA device detected, using GPU post-processing 🚀[/green]")
+
+            # Prefer the TensorRT engine for EDSR when one has been built
+            engine_path = TRT_ENGINES[self.quant]
+            if model_name == 'edsr' and trt is not None and os.path.exists(engine_path):
+                try:
+                    self.trt_engine = TensorRTUpsampler(engine_path)
+                    console.print(f"[green]TensorRT {self.quant.upper()} engine loaded, running EDSR on the GPU 🚀[/green]")
+                except Exception as e:
+                    console.print(f"[yellow]Failed to load TensorRT engine, using OpenCV DNN: {str(e)}[/yellow]")
+            elif model_name == 'edsr':
+                reason = "TensorRT is not installed" if trt is None else f"{engine_path} not found"
+                console.print(f"[yellow]{reason}, running EDSR on the CPU (this can take minutes per image)[/yellow]")
+            self.loaded_model = model_name
         except Exception as e:
             console.print(f"[red]Failed to load AI model: {str(e)}[/red]")
+            # Left unset so the next enhance retries (and resumes a partial download)
+            self.loaded_model = None
             self.sr = None
 
     def show_welcome(self):
@@ -61,7 +510,7 @@ class ImageProcessor:
             "resize <width> <height>": "Resize images to specified dimensions",
             "convert <format>": "Convert images to specified format (jpg/png/bmp)",
             "filter <name> <value>": "Apply filter (brightness/contrast/sharpen/grayscale)",
-            "enhance": "Apply AI enhancement to improve image quality (2x upscale)",
+            "enhance [model]": "Apply AI enhancement to improve image quality (2x upscale, fsrcnn/espcn/lapsrn/edsr)",
             "organize": "Organize images into folders by format",
             "help": "Show this help message",
             "exit": "Exit the program"
@@ -74,6 +523,7 @@ class ImageProcessor:
 
     def enhance_image(self, img_path):
         """Enhance image using AI super resolution"""
+        self.load_ai_model()
         if self.sr is None:
             raise Exception("AI Enhancement model not available")
         
@@ -82,68 +532,322 @@ class ImageProcessor:
         if img is None:
             raise Exception(f"Failed to load image: {img_path}")
         
-        # Apply super resolution
-        enhanced = self.sr.upsample(img)
+        enhanced = self.upscale(img)
+        return self.save_enhanced(img_path, enhanced)
+
+    def enhance_batch(self, input_path, files):
+        """Enhance several images, batching the super resolution step (model must be loaded)
+
+        Returns a list of (file, error) for the images that failed.
+        """
+        if self.sr is None:
+            raise Exception("AI Enhancement model not available")
+        
+        imgs = []
+        loaded = []
+        failures = []
+        for file in files:
+            img = cv2.imread(os.path.join(input_path, file))
+            if img is None:
+                failures.append((file, f"Failed to load image: {file}"))
+                continue
+            imgs.append(img)
+            loaded.append(file)
+        
+        if imgs:
+            for file, enhanced in zip(loaded, self.upscale_batch(imgs)):
+                if isinstance(enhanced, Exception):
+                    failures.append((file, str(enhanced)))
+                    continue
+                try:
+                    self.save_enhanced(os.path.join(input_path, file), enhanced)
+                except Exception as e:
+                    failures.append((file, str(e)))
+        return failures
+
+    def upscale(self, img):
+        """Apply super resolution, large images get a plain bicubic upscale"""
+        if self.trt_engine is not None and self.trt_engine.supports(img):
+            return self.trt_engine.upsample(img)
+        
+        height, width = img.shape[:2]
+        if height * width > SR_MAX_PIXELS:
+            return cv2.resize(img, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC)
+        return self.sr.upsample(img)
+
+    def upscale_single(self, img):
+        """Upscale one image, returning the exception instead of raising it"""
+        try:
+            return self.upscale(img)
+        except Exception as e:
+            return e
+
+    def upscale_batch(self, imgs):
+        """Upscale a list of images, running same-sized ones through TensorRT together
+
+        Images upscaled one at a time get their exception in place of a result if they
+        fail, a failed TensorRT batch call raises.
+        """
+        if self.trt_engine is None:
+            return [self.upscale_single(img) for img in imgs]
         
-        # Apply additional enhancements
-        enhanced = cv2.detailEnhance(enhanced, sigma_s=10, sigma_r=0.15)
+        results = [None] * len(imgs)
+        groups = {}
+        for i, img in enumerate(imgs):
+            if self.trt_engine.supports(img):
+                groups.setdefault(img.shape, []).append(i)
+            else:
+                results[i] = self.upscale_single(img)
         
-        # Adjust contrast and brightness
-        alpha = 1.2  # Contrast control
-        beta = 10    # Brightness control
-        enhanced = cv2.convertScaleAbs(enhanced, alpha=alpha, beta=beta)
+        for indices in groups.values():
+            batch = self.trt_engine.upsample_batch([imgs[i] for i in indices])
+            for i, enhanced in zip(indices, batch):
+                results[i] = enhanced
+        return results
+
+    def save_enhanced(self, img_path, enhanced):
+        """Post-process an upscaled image and save it"""
+        done = False
+        # detailEnhance has no CUDA counterpart, so only the fast path runs on the GPU
+        if self.use_cuda and self.detail == 'fast':
+            try:
+                enhanced = self.postprocess_cuda(enhanced, ENHANCE_ALPHA, ENHANCE_BETA)
+                done = True
+            except cv2.error as e:
+                # Some CUDA builds miss individual kernels, fall back to CPU
+                console.print(f"[yellow]GPU post-processing failed, using CPU: {str(e)}[/yellow]")
+                self.use_cuda = False
+
+        if not done:
+            # Apply additional enhancements
+            if self.detail == 'quality':
+                enhanced = cv2.detailEnhance(enhanced, sigma_s=10, sigma_r=0.15)
+                # Contrast and brightness adjustment
+                enhanced = cv2.LUT(enhanced, self._scale_lut)
+            else:
+                # Unsharp mask, much cheaper than the edge-aware detailEnhance
+                blur = cv2.GaussianBlur(enhanced, (0, 0), sigmaX=2)
+                if numba is not None:
+                    # Sharpen and adjust contrast/brightness in one pass over the image
+                    out = np.empty_like(enhanced)
+                    fused_postprocess(enhanced, blur, out, self._scale_lut, SHARPEN_AMOUNT)
+                    enhanced = out
+                else:
+                    enhanced = cv2.addWeighted(enhanced, 1 + SHARPEN_AMOUNT, blur, -SHARPEN_AMOUNT, 0)
+                    # Contrast and brightness adjustment
+                    enhanced = cv2.LUT(enhanced, self._scale_lut)
         
-        # Save enhanced image
+        # Save enhanced image, handing the disk write to the writer thread when one is running
         output_path = f"enhanced_{os.path.basename(img_path)}"
-        cv2.imwrite(output_path, enhanced)
+        ok, buf = cv2.imencode(os.path.splitext(output_path)[1], enhanced)
+        if not ok:
+            raise Exception(f"Failed to encode image: {output_path}")
+        
+        if self.writer is not None:
+            self.writer.write(output_path, buf)
+        else:
+            with open(output_path, 'wb') as f:
+                f.write(buf)
         return output_path
 
+    def postprocess_cuda(self, enhanced, alpha, beta):
+        """Run the post-SR enhancements on the GPU"""
+        gpu = cv2.cuda_GpuMat()
+        gpu.upload(enhanced)
+        # CUDA filters support 4 channel images but not 3 channel ones
+        gpu = cv2.cuda.cvtColor(gpu, cv2.COLOR_BGR2BGRA)
+        
+        # Same unsharp mask as the CPU fast path
+        if self._cuda_blur is None:
+            self._cuda_blur = cv2.cuda.createGaussianFilter(cv2.CV_8UC4, cv2.CV_8UC4, (13, 13), 2)
+        blur = self._cuda_blur.apply(gpu)
+        gpu = cv2.cuda.addWeighted(gpu, 1 + SHARPEN_AMOUNT, blur, -SHARPEN_AMOUNT, 0)
+        gpu = gpu.convertTo(cv2.CV_8U, alpha=alpha, beta=beta)
+        
+        return cv2.cuda.cvtColor(gpu, cv2.COLOR_BGRA2BGR).download()
+
     def process_images(self, input_path, operation, *args):
         if not os.path.exists(input_path):
             console.print("[red]Error: Input path does not exist![/red]")
             return
 
-        files = [f for f in os.listdir(input_path) if os.path.splitext(f)[1].lower() in self.supported_formats]
+        with os.scandir(input_path) as entries:
+            files = [
+                entry.name for entry in entries
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in self._fmt_set
+            ]
         
         if not files:
             console.print("[yellow]No supported image files found in the directory![/yellow]")
             return
 
-        with Progress() as progress:
-            task = progress.add_task("[cyan]Processing images...", total=len(files))
+        # The SR network is a single shared object, so enhance stays serial
+        if operation == "enhance":
+            workers = 1
+            self.load_ai_model()
+            # Write results on a separate thread so the next image can be upscaled meanwhile
+            self.writer = BackgroundWriter()
+        else:
+            # Each worker holds one decoded image, so this also bounds memory use
+            workers = os.cpu_count()
+            if operation == "convert":
+                # Workers decode and encode, disk writes go through a bounded queue
+                self.writer = BackgroundWriter()
+
+        try:
+            with Progress() as progress, ThreadPoolExecutor(max_workers=workers) as executor:
+                task = progress.add_task("[cyan]Processing images...", total=len(files))
 
-            for file in files:
                 try:
-                    image_path = os.path.join(input_path, file)
-                    
                     if operation == "enhance":
-                        self.enhance_image(image_path)
+                        # Same-sized images are upscaled together when TensorRT can batch them
+                        if self.trt_engine is not None:
+                            groups = self.group_by_size(input_path, files)
+                        else:
+                            groups = [[file] for file in files]
+                        futures = {
+                            executor.submit(self.enhance_batch, input_path, group): group
+                            for group in groups
+                        }
                     else:
-                        img = Image.open(image_path)
-                        
-                        if operation == "resize":
-                            width, height = map(int, args)
-                            img = img.resize((width, height), Image.Resampling.LANCZOS)
-                            img.save(f"resized_{file}")
-                        
-                        elif operation == "convert":
-                            new_format = args[0].lower()
-                            new_filename = os.path.splitext(file)[0] + f".{new_format}"
-                            img.save(new_filename)
-                        
-                        elif operation == "filter":
-                            filter_name, value = args[0], float(args[1])
-                            if filter_name in self.filters:
-                                img = self.filters[filter_name](img, value)
-                                img.save(f"filtered_{file}")
+                        futures = {
+                            executor.submit(self._process_one, input_path, file, operation, args): [file]
+                            for file in files
+                        }
+
+                    for future in as_completed(futures):
+                        group = futures[future]
+                        try:
+                            failures = future.result() or []
+                        except Exception as e:
+                            failures = [(file, str(e)) for file in group]
                     
-                    progress.advance(task)
-                    time.sleep(0.1)
-                
-                except Exception as e:
-                    console.print(f"[red]Error processing {file}: {str(e)}[/red]")
+                        for file, error in failures:
+                            console.print(f"[red]Error processing {file}: {error}[/red]")
+                        progress.advance(task, len(group) - len(failures))
+                except BaseException:
+                    # Drop the queued files so Ctrl-C stops the run right away
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+        finally:
+            write_errors = []
+            if self.writer is not None:
+                write_errors = self.writer.close()
+                self.writer = None
+
+        for path, error in write_errors:
+            console.print(f"[red]Error writing {path}: {error}[/red]")
+        if write_errors:
+            console.print(f"[yellow]Processing complete, {len(write_errors)} file(s) could not be written[/yellow]")
+        else:
+            console.print("[green]Processing complete! ✨[/green]")
+
+    def group_by_size(self, input_path, files):
+        """Split files into batches of equal image dimensions, read from the headers only"""
+        groups = {}
+        for file in files:
+            try:
+                with Image.open(os.path.join(input_path, file)) as img:
+                    size = img.size
+            except Exception:
+                size = None
+            groups.setdefault(size, []).append(file)
+        
+        return [
+            group[i:i + ENHANCE_BATCH_SIZE]
+            for group in groups.values()
+            for i in range(0, len(group), ENHANCE_BATCH_SIZE)
+        ]
+
+    def _process_one(self, input_path, file, operation, args):
+        """Apply a single operation to one image file"""
+        image_path = os.path.join(input_path, file)
+
+        if operation == "convert":
+            new_format = args[0].lower()
+            new_filename = os.path.splitext(file)[0] + f".{new_format}"
+            
+            # Converting the working directory into its own format, the file is already there
+            if os.path.exists(new_filename) and os.path.samefile(image_path, new_filename):
+                return
+            
+            # Same codec under a different extension, copy the bytes as they are
+            old_format = os.path.splitext(file)[1].lower().lstrip('.')
+            if FORMAT_ALIASES.get(old_format, old_format) == FORMAT_ALIASES.get(new_format, new_format):
+                shutil.copyfile(image_path, new_filename)
+                return
+
+        if operation == "resize":
+            width, height = map(int, args)
+            if self._tj is not None and os.path.splitext(file)[1].lower() in ('.jpg', '.jpeg'):
+                if self.resize_jpeg_turbo(image_path, file, width, height):
+                    return
+
+        img = Image.open(image_path)
+
+        if operation == "resize":
+            # Let libjpeg decode at a reduced scale (no-op for other formats)
+            img.draft('RGB', (width, height))
+            # OpenCV's area filter is cheaper than Pillow's resampling for downscales. RGBA stays
+            # on Pillow, which premultiplies alpha and so avoids dark halos at transparent edges
+            if img.mode in ('L', 'RGB') and width <= img.width and height <= img.height:
+                resized = Image.fromarray(cv2.resize(np.asarray(img), (width, height), interpolation=cv2.INTER_AREA))
+                resized.info = img.info
+                img = resized
+            else:
+                img = img.resize((width, height), RESAMPLE, reducing_gap=3.0)
+            img.save(f"resized_{file}")
+
+        elif operation == "convert":
+            if self.writer is None:
+                img.save(new_filename)
+                return
+            
+            fmt = Image.registered_extensions().get(f".{new_format}")
+            if fmt is None:
+                raise ValueError(f"unknown file extension: .{new_format}")
+            buf = io.BytesIO()
+            img.save(buf, format=fmt)
+            self.writer.write(new_filename, buf.getvalue())
 
-        console.print("[green]Processing complete! ✨[/green]")
+        elif operation == "filter":
+            filter_name, value = args[0], float(args[1])
+            if filter_name in self.filters:
+                img = self.filters[filter_name](img, value)
+                img.save(f"filtered_{file}")
+
+    def resize_jpeg_turbo(self, image_path, file, width, height):
+        """Resize a JPEG using libjpeg-turbo scaled decoding, returns False if not worthwhile"""
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        
+        # Files libjpeg-turbo can't parse (mislabelled PNGs, trailing junk) go to Pillow
+        try:
+            src_width, src_height, _, colorspace = self._tj.decode_header(data)
+        except OSError:
+            return False
+        # Only color JPEGs, grayscale would come back as 3 channel BGR
+        if colorspace in (TJCS_CMYK, TJCS_YCCK, TJCS_GRAY):
+            return False
+        
+        # Smallest DCT scale that still covers the target size
+        factor = None
+        for denom in (8, 4, 2):
+            if src_width // denom >= width and src_height // denom >= height:
+                factor = (1, denom)
+                break
+        if factor is None:
+            return False
+        
+        try:
+            arr = self._tj.decode(data, scaling_factor=factor)
+        except OSError:
+            return False
+        arr = cv2.resize(arr, (width, height), interpolation=cv2.INTER_AREA)
+        
+        with open(f"resized_{file}", 'wb') as f:
+            f.write(self._tj.encode(arr, quality=75))
+        return True
 
     def adjust_brightness(self, img, factor):
         enhancer = ImageEnhance.Brightness(img)
@@ -158,25 +862,50 @@ class ImageProcessor:
         return enhancer.enhance(factor)
 
     def convert_grayscale(self, img, _):
+        # OpenCV's fixed-point SIMD conversion, Pillow handles the other modes
+        if img.mode == 'RGB':
+            return Image.fromarray(cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2GRAY))
+        if img.mode == 'RGBA':
+            return Image.fromarray(cv2.cvtColor(np.asarray(img), cv2.COLOR_RGBA2GRAY))
         return img.convert('L')
 
     def organize_images(self, path):
-        for file in os.listdir(path):
-            ext = os.path.splitext(file)[1].lower()
-            if ext in self.supported_formats:
-                folder_name = ext[1:]  # Remove the dot
-                folder_path = os.path.join(path, folder_name)
-                
-                if not os.path.exists(folder_path):
-                    os.makedirs(folder_path)
-                
-                os.rename(
-                    os.path.join(path, file),
-                    os.path.join(folder_path, file)
-                )
+        with os.scandir(path) as entries:
+            images = [
+                (entry.name, os.path.splitext(entry.name)[1].lower())
+                for entry in entries
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in self._fmt_set
+            ]
+        
+        # Create each format folder once instead of checking per file
+        for ext in {ext for _, ext in images}:
+            os.makedirs(os.path.join(path, ext[1:]), exist_ok=True)  # Remove the dot
+        
+        # Issue the renames concurrently so slow filesystems see a deeper queue
+        with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+            list(executor.map(
+                lambda image: os.rename(
+                    os.path.join(path, image[0]),
+                    os.path.join(path, image[1][1:], image[0])
+                ),
+                images
+            ))
 
 def main():
-    processor = ImageProcessor()
+    parser = argparse.ArgumentParser(description="Image Processing Tool")
+    parser.add_argument("--quant", choices=TRT_ENGINES, default='fp16',
+                        help="TensorRT engine precision used by 'enhance edsr'")
+    parser.add_argument("--detail", choices=['fast', 'quality'], default='fast',
+                        help="Detail enhancement after upscaling: unsharp mask (fast) or cv2.detailEnhance (quality)")
+    parser.add_argument("--build-int8", nargs=2, metavar=("ONNX", "CALIB_DIR"),
+                        help="Build the INT8 EDSR engine from an ONNX model and sample images, then exit")
+    args = parser.parse_args()
+
+    if args.build_int8:
+        build_int8_engine(*args.build_int8)
+        return
+
+    processor = ImageProcessor(quant=args.quant, detail=args.detail)
     processor.show_welcome()
     processor.show_help()
 
@@ -207,7 +936,9 @@ def main():
                 elif parts[0] == "filter" and len(parts) == 3:
                     processor.process_images(path, "filter", parts[1], parts[2])
                 
-                elif parts[0] == "enhance":
+                elif parts[0] == "enhance" and len(parts) <= 2 and (len(parts) == 1 or parts[1] in SR_MODELS):
+                    model_name = parts[1] if len(parts) == 2 else DEFAULT_SR_MODEL
+                    processor.sr_model = model_name
                     processor.process_images(path, "enhance")
                 
                 elif parts[0] == "organize":